@@ -1,33 +1,71 @@
 import os
+import sys
 import time
-from src.settings import parse_arguments, get_file_list, print_settings
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from tqdm import tqdm
+from src.settings import parse_arguments, get_file_list, get_output_dir, print_settings
 from src.processor import VideoProcessor
-from src.utils import print_conversion_result, print_summary
+from src.utils import get_video_info, print_conversion_result, print_summary
+
+# Set once per worker by the pool initializer, so tasks don't each pickle
+# the processor and its probe cache
+_worker_processor = None
+
+def _init_worker(processor):
+    """Pin a worker to its cores and keep its output off the shared terminal"""
+    global _worker_processor
+    _worker_processor = processor
+    processor._set_cpu_affinity()
+    if processor.jobs > 1:
+        # Interleaved progress bars from several files are unreadable;
+        # results are still reported by the main process
+        sys.stdout = sys.stderr = open(os.devnull, 'w')
+
+def _convert_file(input_file, output_dir, chunk_size):
+    """Convert one file with this worker's processor"""
+    return _worker_processor.convert_video(input_file, output_dir, chunk_size)
 
 def main():
     # Parse arguments
     args = parse_arguments()
 
+    # Get file list
+    files = get_file_list(args.input, args.recursive)
+    if not files:
+        print("No .ts files found!")
+        return
+
+    # Probe all files up front, concurrently, so workers start with cached info
+    with ThreadPoolExecutor(max_workers=min(32, len(files))) as executor:
+        probe_results = dict(zip(files, executor.map(get_video_info, map(str, files))))
+
     # Initialize processor
     processor = VideoProcessor(
         cpu_limit=args.cpu_limit,
         compression_level=args.compress,
         target_size=args.target_size,
-        quality=args.quality
+        quality=args.quality,
+        hwaccel=args.hwaccel,
+        force_reencode=args.force_reencode,
+        pipeline=args.pipeline,
+        preloaded_info=probe_results,
+        jobs=args.jobs
     )
+    # No point in more workers than files; a lone file gets the chunked pipeline
+    processor.jobs = args.jobs = min(processor.jobs, len(files))
 
     # Print settings
-    print_settings(args, processor.cores_to_use)
+    print_settings(args, processor.cores_to_use, processor.hwaccel)
 
     # Setup output directory
     output_dir = args.output or os.path.join(os.path.dirname(os.path.abspath(args.input)), 'results')
     os.makedirs(output_dir, exist_ok=True)
 
-    # Get file list
-    files = get_file_list(args.input, args.recursive)
-    if not files:
-        print("No .ts files found!")
-        return
+    # Outputs are named after the file, so same-named files from different
+    # folders (-r) would overwrite each other; keep them in mirrored subfolders
+    output_dirs = {file: get_output_dir(file, args.input, output_dir) for file in files}
+    for file_output_dir in set(output_dirs.values()):
+        os.makedirs(file_output_dir, exist_ok=True)
 
     print(f"\nFound {len(files)} files to convert")
     print(f"Output directory: {output_dir}\n")
@@ -43,32 +81,42 @@ def main():
     }
 
     # Process files
-    for i, file in enumerate(files, 1):
-        print(f"\nProcessing file {i} of {len(files)}")
-        original_size = os.path.getsize(file) / (1024 * 1024)
-        result = processor.convert_video(str(file), output_dir, args.chunk_size)
-        
-        if result['success']:
-            stats['successful'] += 1
-            stats['total_size_reduction'] += result['compression_ratio']
-            
-            if args.delete_original:
-                try:
-                    os.remove(file)
-                    stats['deleted_files'] += 1
-                    stats['saved_space'] += original_size - result['size']
-                except Exception as e:
-                    print(f"Warning: Could not delete original file: {str(e)}")
-        else:
-            stats['failed'] += 1
-            if args.delete_original and not args.keep_failed:
-                try:
-                    os.remove(file)
-                    stats['deleted_files'] += 1
-                except Exception as e:
-                    print(f"Warning: Could not delete original file: {str(e)}")
-        
-        print_conversion_result(result, original_size)
+    original_sizes = {file: os.path.getsize(file) / (1024 * 1024) for file in files}
+    # Run several files at once, each worker on its own slice of cores
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=_init_worker, initargs=(processor,)) as executor:
+        futures = {
+            executor.submit(_convert_file, str(file), output_dirs[file], args.chunk_size): file
+            for file in files
+        }
+
+        with tqdm(total=len(files), desc="Converting files", unit="file") as pbar:
+            for future in as_completed(futures):
+                file = futures[future]
+                original_size = original_sizes[file]
+                result = future.result()
+
+                if result['success']:
+                    stats['successful'] += 1
+                    stats['total_size_reduction'] += result['compression_ratio']
+                    
+                    if args.delete_original:
+                        try:
+                            os.remove(file)
+                            stats['deleted_files'] += 1
+                            stats['saved_space'] += original_size - result['size']
+                        except Exception as e:
+                            print(f"Warning: Could not delete original file: {str(e)}")
+                else:
+                    stats['failed'] += 1
+                    if args.delete_original and not args.keep_failed:
+                        try:
+                            os.remove(file)
+                            stats['deleted_files'] += 1
+                        except Exception as e:
+                            print(f"Warning: Could not delete original file: {str(e)}")
+                
+                print_conversion_result(result, original_size)
+                pbar.update(1)
 
     # Calculate final statistics
     elapsed_time = time.time() - stats['start_time']
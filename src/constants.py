@@ -1,19 +1,25 @@
-# Compression presets
+# Compression presets, already split into ffmpeg arguments
 COMPRESSION_SETTINGS = {
     'light': {
-        'scale': '-vf scale=-1:720',
-        'bitrate': '-b:v 1500k -maxrate 2000k -bufsize 2000k',
-        'audio': '-ac 2 -ar 44100 -b:a 128k'
+        'scale': ('-vf', 'scale=-1:720'),
+        'scale_npp': ('-vf', 'scale_npp=w=-2:h=720:format=nv12:interp_algo=lanczos'),
+        'scale_vaapi': ('-vf', 'format=nv12|vaapi,hwupload,scale_vaapi=w=-2:h=720'),
+        'bitrate': ('-b:v', '1500k', '-maxrate', '2000k', '-bufsize', '2000k'),
+        'audio': ('-ac', '2', '-ar', '44100', '-b:a', '128k')
     },
     'medium': {
-        'scale': '-vf scale=-1:480',
-        'bitrate': '-b:v 1000k -maxrate 1500k -bufsize 1500k',
-        'audio': '-ac 2 -ar 44100 -b:a 96k'
+        'scale': ('-vf', 'scale=-1:480'),
+        'scale_npp': ('-vf', 'scale_npp=w=-2:h=480:format=nv12:interp_algo=lanczos'),
+        'scale_vaapi': ('-vf', 'format=nv12|vaapi,hwupload,scale_vaapi=w=-2:h=480'),
+        'bitrate': ('-b:v', '1000k', '-maxrate', '1500k', '-bufsize', '1500k'),
+        'audio': ('-ac', '2', '-ar', '44100', '-b:a', '96k')
     },
     'high': {
-        'scale': '-vf scale=-1:360',
-        'bitrate': '-b:v 500k -maxrate 700k -bufsize 700k',
-        'audio': '-ac 2 -ar 44100 -b:a 64k'
+        'scale': ('-vf', 'scale=-1:360'),
+        'scale_npp': ('-vf', 'scale_npp=w=-2:h=360:format=nv12:interp_algo=lanczos'),
+        'scale_vaapi': ('-vf', 'format=nv12|vaapi,hwupload,scale_vaapi=w=-2:h=360'),
+        'bitrate': ('-b:v', '500k', '-maxrate', '700k', '-bufsize', '700k'),
+        'audio': ('-ac', '2', '-ar', '44100', '-b:a', '64k')
     }
 }
 
@@ -29,10 +35,77 @@ DEFAULT_FFMPEG_PARAMS = {
     'audio_params': [
         '-ac', '2',
         '-ar', '44100'
-    ]
+    ],
+    'quality_flag': '-crf'
 }
 
+# Hardware encoder presets, selected with --hwaccel
+HWACCEL_ENCODERS = {
+    'nvenc': {
+        'video_codec': 'h264_nvenc',
+        'video_params': [
+            '-preset', 'p4',
+            '-tune', 'hq',
+            '-rc', 'vbr',
+            '-b:v', '0',
+            '-movflags', '+faststart'
+        ],
+        'quality_flag': '-cq'
+    },
+    'qsv': {
+        'video_codec': 'h264_qsv',
+        'video_params': [
+            '-preset', 'faster',
+            '-movflags', '+faststart'
+        ],
+        'quality_flag': '-global_quality'
+    },
+    'vaapi': {
+        'video_codec': 'h264_vaapi',
+        'video_params': [
+            '-bf', '2',
+            '-movflags', '+faststart'
+        ],
+        'quality_flag': '-qp'
+    }
+}
+
+# NVDEC decoders keyed by the ffprobe codec_name of the input video stream
+CUVID_DECODERS = {
+    'h264': 'h264_cuvid',
+    'hevc': 'hevc_cuvid',
+    'mpeg1video': 'mpeg1_cuvid',
+    'mpeg2video': 'mpeg2_cuvid',
+    'mpeg4': 'mpeg4_cuvid',
+    'vc1': 'vc1_cuvid',
+    'vp9': 'vp9_cuvid',
+    'av1': 'av1_cuvid'
+}
+
+# VAAPI render node and the filter that uploads software frames to it
+VAAPI_DEVICE = '/dev/dri/renderD128'
+VAAPI_UPLOAD_FILTER = 'format=nv12|vaapi,hwupload'
+
+# Extra (input, output) arguments for the trial encode that checks a hardware
+# encoder actually works; being listed by `ffmpeg -encoders` only means it was built in
+HWACCEL_TEST_PARAMS = {
+    'nvenc': ((), ()),
+    'vaapi': (('-vaapi_device', VAAPI_DEVICE), ('-vf', 'format=nv12,hwupload')),
+    'qsv': ((), ())
+}
+
+HWACCEL_CHOICES = ['auto', 'nvenc', 'vaapi', 'qsv', 'none']
+PIPELINE_CHOICES = ['parallel', 'streamed']
+
+# Sources with these codecs are remuxed to MP4 instead of re-encoded
+REMUX_VIDEO_CODECS = ('h264',)
+REMUX_AUDIO_CODECS = ('aac', 'mp3')
+DEFAULT_QUALITY = 23
+
 # Chunk processing settings
 MIN_CHUNK_SIZE = 30  # seconds
 MAX_CHUNK_SIZE = 300  # seconds
-DEFAULT_KEYFRAME_INTERVAL = 10  # seconds
\ No newline at end of file
+MIN_CHUNKED_DURATION = 300  # seconds, shorter files are encoded in one pass
+DEFAULT_KEYFRAME_INTERVAL = 10  # seconds
+STALL_TIMEOUT = 30  # seconds without encode progress before a job is killed
+MAX_HW_JOBS = 2  # consumer GPUs limit how many encode sessions run at once
\ No newline at end of file
@@ -1,56 +1,154 @@
 import os
+import glob
 import subprocess
-import tempfile
 import shutil
 import psutil
 import multiprocessing
 import math
 import time
-from concurrent.futures import ThreadPoolExecutor
+import asyncio
 from tqdm import tqdm
 from datetime import datetime
-from .constants import COMPRESSION_SETTINGS, DEFAULT_FFMPEG_PARAMS, MIN_CHUNK_SIZE, MAX_CHUNK_SIZE, DEFAULT_KEYFRAME_INTERVAL
-from .utils import get_video_info, calculate_target_bitrate
+from .constants import (COMPRESSION_SETTINGS, DEFAULT_FFMPEG_PARAMS, HWACCEL_ENCODERS,
+                        HWACCEL_TEST_PARAMS, CUVID_DECODERS, VAAPI_DEVICE, VAAPI_UPLOAD_FILTER, REMUX_VIDEO_CODECS, REMUX_AUDIO_CODECS, DEFAULT_QUALITY,
+                        MIN_CHUNK_SIZE, MAX_CHUNK_SIZE, MIN_CHUNKED_DURATION, STALL_TIMEOUT, MAX_HW_JOBS)
+from .utils import run_command, make_temp_dir, build_concat_list, get_core_cpus, get_video_info, get_ffmpeg_encoders, get_ffmpeg_decoders, can_encode_with, calculate_target_bitrate
 
 class VideoProcessor:
-    def __init__(self, cpu_limit=0.1, compression_level=None, target_size=None, quality=23):
+    def __init__(self, cpu_limit=0.1, compression_level=None, target_size=None, quality=DEFAULT_QUALITY,
+                 hwaccel='auto', force_reencode=False, preloaded_info=None, jobs=None,
+                 pipeline='parallel'):
         self.cpu_limit = cpu_limit
         self.compression_level = compression_level
         self.target_size = target_size
         self.quality = quality
+        self.force_reencode = force_reencode
+        self.pipeline = pipeline
+        self._lower_priority()
+        # Read before pinning, so pickled copies for workers keep every core
+        self.core_cpus = get_core_cpus()
         self.cores_to_use = self._set_cpu_affinity()
+        # Threads per chunk encode; chunk workers = cores_to_use // ffmpeg_threads
+        self.ffmpeg_threads = 2
+        self.available_encoders = get_ffmpeg_encoders()
+        self.hwaccel = self._select_hwaccel(hwaccel)
+        # Files converted at once; by default enough to keep every core busy,
+        # but never more than the GPU has encode sessions for
+        self.jobs = jobs or max(1, len(self.core_cpus) // self.cores_to_use)
+        if self.hwaccel != 'none':
+            self.jobs = min(self.jobs, MAX_HW_JOBS)
+        self.hw_decoders = get_ffmpeg_decoders() if self.hwaccel == 'nvenc' else set()
+        self.hw_decoder = None
+        self.total_duration = None
+        self._probe_cache = {}
+        self._seed_probe_cache(preloaded_info or {})
         self._init_ffmpeg_params()
 
+    def _lower_priority(self):
+        """Lower CPU and I/O priority once; every ffmpeg we start inherits it"""
+        try:
+            process = psutil.Process(os.getpid())
+            if os.name == 'nt':
+                process.nice(psutil.BELOW_NORMAL_PRIORITY_CLASS)
+            else:
+                process.nice(19)
+                # Lowest best-effort level; the idle class can starve reads
+                # long enough for the stall watchdog to kill healthy encodes
+                if hasattr(psutil, 'IOPRIO_CLASS_BE'):
+                    process.ionice(psutil.IOPRIO_CLASS_BE, 7)
+        except:
+            pass
+
     def _set_cpu_affinity(self):
         """Set CPU affinity based on limit"""
         try:
             process = psutil.Process(os.getpid())
-            cpu_count = multiprocessing.cpu_count()
+            # SMT siblings share execution units, so budget by physical cores
+            cpu_count = len(self.core_cpus)
             cores_to_use = max(1, int(cpu_count * self.cpu_limit))
-            available_cores = list(range(cpu_count))
-            cores_to_use_list = available_cores[:cores_to_use]
+            # Pool workers each get their own slice of cores
+            identity = multiprocessing.current_process()._identity
+            worker_index = identity[0] - 1 if identity else 0
+            start = (worker_index * cores_to_use) % cpu_count
+            cores_to_use_list = [self.core_cpus[(start + i) % cpu_count] for i in range(cores_to_use)]
             process.cpu_affinity(cores_to_use_list)
             return cores_to_use
         except:
             return 1
 
+    def _seed_probe_cache(self, preloaded_info):
+        """Fill the probe cache with ffprobe results gathered by the caller"""
+        for path, info in preloaded_info.items():
+            if not info:
+                continue
+            try:
+                key = (os.path.abspath(path), os.path.getmtime(path))
+            except OSError:
+                continue
+            self._probe_cache[key] = info
+
+    def _select_hwaccel(self, hwaccel):
+        """Resolve the requested hardware acceleration mode"""
+        if hwaccel != 'auto':
+            return hwaccel
+
+        # Prefer NVENC, then VAAPI (Intel/AMD), then Quick Sync, then libx264
+        for candidate in ('nvenc', 'vaapi', 'qsv'):
+            if self._hw_encoder_works(candidate):
+                return candidate
+        return 'none'
+
+    def _hw_encoder_works(self, hwaccel):
+        """Check that a hardware encoder is built in and usable with this machine's GPU"""
+        codec = HWACCEL_ENCODERS[hwaccel]['video_codec']
+        if codec not in self.available_encoders:
+            return False
+        return can_encode_with(codec, *HWACCEL_TEST_PARAMS[hwaccel])
+
+    def _use_software_encoder(self, video_info):
+        """Switch from a failing hardware encoder to libx264"""
+        self.hwaccel = 'none'
+        self.hw_decoder = None
+        self.optimize_video_params(video_info)
+
     def _init_ffmpeg_params(self):
         """Initialize FFmpeg parameters"""
         self.ffmpeg_params = DEFAULT_FFMPEG_PARAMS.copy()
+        if self.hwaccel in HWACCEL_ENCODERS:
+            self.ffmpeg_params.update(HWACCEL_ENCODERS[self.hwaccel])
         self.ffmpeg_params['video_params'] = self.ffmpeg_params['video_params'].copy()
-        self.ffmpeg_params['video_params'].extend(['-crf', str(self.quality)])
-        self.ffmpeg_params['thread_params'] = ['-threads', str(self.cores_to_use)]
+        self.ffmpeg_params['video_params'].extend([self.ffmpeg_params['quality_flag'], str(self.quality)])
+
+        # Hardware encoders ignore -threads. A single ffmpeg gets every core,
+        # parallel chunk encodes get a few each so they don't oversubscribe
+        if self.hwaccel in HWACCEL_ENCODERS:
+            self.ffmpeg_params['thread_params'] = []
+            self.ffmpeg_params['chunk_thread_params'] = []
+        else:
+            self.ffmpeg_params['thread_params'] = ['-threads', str(self.cores_to_use)]
+            self.ffmpeg_params['chunk_thread_params'] = ['-threads', str(self.ffmpeg_threads)]
 
         if self.compression_level:
             self.ffmpeg_params['compression'] = COMPRESSION_SETTINGS[self.compression_level]
 
+        self._build_argv()
+
     def optimize_video_params(self, video_info):
         """Optimize video parameters based on input analysis"""
         try:
+            # Start from the defaults, workers reuse one processor for every file
+            self._init_ffmpeg_params()
             video_stream = next((s for s in video_info['streams'] 
                                if s['codec_type'] == 'video'), None)
             
             if video_stream:
+                # Decode on the GPU as well so frames never leave VRAM
+                self.hw_decoder = None
+                if self.hwaccel == 'nvenc':
+                    decoder = CUVID_DECODERS.get(video_stream.get('codec_name'))
+                    if decoder in self.hw_decoders:
+                        self.hw_decoder = decoder
+
                 width = int(video_stream.get('width', 0))
                 height = int(video_stream.get('height', 0))
                 
@@ -82,127 +180,408 @@ class VideoProcessor:
                             '-bufsize', '5000k'
                         ])
 
+            self._build_argv()
             return True
         except Exception as e:
             print(f"Error optimizing video parameters: {str(e)}")
             return False
 
+    def _chunk_bounds(self, duration, chunk_duration):
+        """Start time and length of every chunk of a duration-long input"""
+        starts = [i * chunk_duration for i in range(math.ceil(duration / chunk_duration))]
+        return [(start, min(chunk_duration, duration - start)) for start in starts]
+
+    async def _run_all(self, commands, desc):
+        """Run commands concurrently, cores_to_use at a time, and return their exit codes"""
+        semaphore = asyncio.Semaphore(self.cores_to_use)
+
+        with tqdm(total=len(commands), desc=desc, unit="chunk") as pbar:
+            async def run(command):
+                async with semaphore:
+                    process = await asyncio.create_subprocess_exec(
+                        *command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                    )
+                    returncode = await process.wait()
+                    pbar.update(1)
+                    return returncode
+
+            return await asyncio.gather(*(run(command) for command in commands))
+
+    def _split_per_chunk(self, input_file, temp_dir, duration, chunk_duration):
+        """Cut each chunk with its own seeking ffmpeg, for inputs the segment muxer rejects"""
+        chunk_specs = [
+            (start, length, os.path.join(temp_dir, f"chunk_{i:03d}.ts"))
+            for i, (start, length) in enumerate(self._chunk_bounds(duration, chunk_duration))
+        ]
+        commands = [
+            [
+                'ffmpeg',
+                '-ss', str(start),
+                '-i', input_file,
+                '-t', str(length),
+                '-c', 'copy',
+                '-map', '0',
+                '-avoid_negative_ts', '1',
+                '-y',
+                chunk_file
+            ]
+            for start, length, chunk_file in chunk_specs
+        ]
+
+        returncodes = asyncio.run(self._run_all(commands, "Splitting video"))
+        if any(returncodes):
+            return []
+        return [chunk_file for _, _, chunk_file in chunk_specs]
+
     def create_optimized_chunks(self, input_file, temp_dir, chunk_duration=60):
         """Create optimized chunks for processing"""
         try:
-            chunks = []
-            video_info = get_video_info(input_file)
+            video_info = get_video_info(input_file, self._probe_cache)
             if not video_info or 'format' not in video_info:
                 return [], None
 
             duration = float(video_info['format']['duration'])
-            self.optimize_video_params(video_info)
-
             num_chunks = math.ceil(duration / chunk_duration)
-            keyframe_interval = min(chunk_duration, DEFAULT_KEYFRAME_INTERVAL)
-            
+            chunk_pattern = os.path.join(temp_dir, "chunk_*.ts")
+
+            # One pass over the source; the segment muxer cuts at keyframes
+            command = [
+                'ffmpeg',
+                '-i', input_file,
+                '-c', 'copy',
+                '-map', '0',
+                '-f', 'segment',
+                '-segment_time', str(chunk_duration),
+                '-reset_timestamps', '1',
+                '-y',
+                os.path.join(temp_dir, "chunk_%03d.ts")
+            ]
+
             print(f"Creating {num_chunks} optimized chunks...")
             with tqdm(total=num_chunks, desc="Splitting video", unit="chunk") as pbar:
-                for i in range(num_chunks):
-                    start_time = i * chunk_duration
-                    chunk_file = os.path.join(temp_dir, f"chunk_{i:03d}.ts")
-                    
-                    command = [
-                        'ffmpeg',
-                        '-ss', str(start_time),
-                        '-i', input_file,
-                        '-t', str(chunk_duration),
-                        '-c', 'copy',
-                        '-force_key_frames', f'expr:gte(t,n_forced*{keyframe_interval})',
-                        '-avoid_negative_ts', '1',
-                        '-y',
-                        chunk_file
-                    ]
-                    
-                    if os.name != 'nt':  # For Unix/Linux
-                        command = ['nice', '-n', '19'] + command
-
-                    subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                    chunks.append(chunk_file)
-                    pbar.update(1)
+                process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                while process.poll() is None:
+                    pbar.n = min(num_chunks, len(glob.glob(chunk_pattern)))
+                    pbar.refresh()
+                    time.sleep(0.5)
+
+                chunks = sorted(glob.glob(chunk_pattern))
+                pbar.total = len(chunks)
+                pbar.n = len(chunks)
+                pbar.refresh()
+
+            if process.returncode != 0 or not chunks:
+                print("Segmenter failed, splitting chunk by chunk...")
+                for chunk in chunks:
+                    os.remove(chunk)
+                chunks = self._split_per_chunk(input_file, temp_dir, duration, chunk_duration)
+                if not chunks:
+                    return [], None
 
-                return chunks, duration
+            return chunks, duration
         except Exception as e:
             print(f"Error creating chunks: {str(e)}")
             return [], None
 
-    def convert_chunk(self, chunk_file, output_file):
-        """Convert a single chunk with optimized settings"""
-        try:
-            command = ['ffmpeg', '-i', chunk_file]
-            
-            # Add video codec and basic parameters
-            command.extend(['-c:v', self.ffmpeg_params['video_codec']])
-            
-            # Add compression settings if specified
-            if self.compression_level:
-                settings = self.ffmpeg_params['compression']
-                command.extend(settings['scale'].split())
-                command.extend(settings['bitrate'].split())
-                command.extend(settings['audio'].split())
-            elif self.target_size:
-                chunk_info = get_video_info(chunk_file)
-                if chunk_info:
-                    chunk_duration = float(chunk_info['format']['duration'])
-                    chunk_target = (self.target_size / self.total_duration) * chunk_duration
-                    video_bitrate, audio_bitrate = calculate_target_bitrate(
-                        chunk_duration, chunk_target
-                    )
-                    command.extend([
-                        '-b:v', f'{video_bitrate}',
-                        '-maxrate', f'{int(video_bitrate * 1.5)}',
-                        '-bufsize', f'{video_bitrate * 2}',
-                        '-b:a', f'{audio_bitrate}'
-                    ])
+    def _build_argv(self):
+        """Precompute the parts of the encode command that don't change per chunk"""
+        self._argv_pre = ('ffmpeg', '-hide_banner', '-loglevel', 'error', '-nostats')
+
+        if self.hw_decoder:
+            self._argv_input = ('-hwaccel', 'cuda', '-hwaccel_output_format', 'cuda', '-c:v', self.hw_decoder)
+        elif self.hwaccel == 'vaapi':
+            self._argv_input = ('-hwaccel', 'vaapi', '-vaapi_device', VAAPI_DEVICE, '-hwaccel_output_format', 'vaapi')
+        else:
+            self._argv_input = ()
+
+        argv_encode = ['-c:v', self.ffmpeg_params['video_codec']]
+        if self.compression_level:
+            settings = self.ffmpeg_params['compression']
+            # Frames decoded to GPU surfaces must be scaled on the GPU
+            if self.hw_decoder:
+                argv_encode.extend(settings['scale_npp'])
+            elif self.hwaccel == 'vaapi':
+                argv_encode.extend(settings['scale_vaapi'])
             else:
-                command.extend(self.ffmpeg_params['video_params'])
-                command.extend(self.ffmpeg_params['audio_params'])
-            
-            # Add thread parameters
-            command.extend(self.ffmpeg_params['thread_params'])
-            command.extend(['-y', output_file])
+                argv_encode.extend(settings['scale'])
+            argv_encode.extend(settings['bitrate'])
+            argv_encode.extend(settings['audio'])
+        elif not self.target_size:
+            argv_encode.extend(self.ffmpeg_params['video_params'])
+            argv_encode.extend(self.ffmpeg_params['audio_params'])
+        elif self.total_duration:
+            # Size scales with duration, so every chunk gets the whole file's bitrate
+            video_bitrate, audio_bitrate = calculate_target_bitrate(
+                self.total_duration, self.target_size
+            )
+            argv_encode.extend([
+                '-b:v', f'{video_bitrate}',
+                '-maxrate', f'{int(video_bitrate * 1.5)}',
+                '-bufsize', f'{video_bitrate * 2}',
+                '-b:a', f'{audio_bitrate}'
+            ])
+
+        # VAAPI encodes from VAAPI surfaces; upload anything decoded in software
+        if self.hwaccel == 'vaapi' and not self.compression_level:
+            argv_encode.extend(['-vf', VAAPI_UPLOAD_FILTER])
+        self._argv_encode = tuple(argv_encode)
 
-            if os.name != 'nt':
-                command = ['nice', '-n', '19'] + command
+        self._argv_threads = tuple(self.ffmpeg_params['thread_params'])
+        self._argv_chunk_threads = tuple(self.ffmpeg_params['chunk_thread_params'])
 
-            subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            return os.path.exists(output_file)
+    def _build_encode_command(self, input_file, output_file, chunked=False, progress=False,
+                              input_options=()):
+        """Build the ffmpeg command that encodes input_file into output_file"""
+        command = list(self._argv_pre)
+        if progress:
+            # Machine-readable key=value progress on stdout
+            command.extend(['-progress', 'pipe:1'])
+        command.extend([*self._argv_input, *input_options, '-i', input_file, *self._argv_encode])
+        command.extend(self._argv_chunk_threads if chunked else self._argv_threads)
+        command.extend(['-y', output_file])
+        return command
+
+    async def _convert_chunk_async(self, semaphore, pbar, chunk_file, output_file, input_options=()):
+        """Convert a single chunk, reporting progress and killing it if it stalls"""
+        async with semaphore:
+            process = None
+            try:
+                command = self._build_encode_command(
+                    chunk_file, output_file, chunked=True, progress=True,
+                    input_options=input_options
+                )
+                process = await asyncio.create_subprocess_exec(
+                    *command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+                )
+
+                loop = asyncio.get_running_loop()
+                out_time_us = 0
+                last_advance = loop.time()
+                while True:
+                    try:
+                        line = await asyncio.wait_for(process.stdout.readline(), STALL_TIMEOUT)
+                    except asyncio.TimeoutError:
+                        line = None
+                    if line == b'':
+                        break
+
+                    if line and line.startswith(b'out_time_us='):
+                        value = line.split(b'=', 1)[1].strip()
+                        if value.isdigit() and int(value) > out_time_us:
+                            pbar.update((int(value) - out_time_us) / 1000000)
+                            out_time_us = int(value)
+                            last_advance = loop.time()
+
+                    if loop.time() - last_advance > STALL_TIMEOUT:
+                        # Watchdog: ffmpeg is alive but not encoding anything
+                        process.kill()
+                        await process.wait()
+                        return False
+
+                await process.wait()
+                return process.returncode == 0 and os.path.exists(output_file)
+            except asyncio.CancelledError:
+                # Don't leave ffmpeg running when another chunk failed
+                if process and process.returncode is None:
+                    process.kill()
+                    await process.wait()
+                raise
+            except Exception:
+                return False
+
+    async def _encode_all(self, jobs):
+        """Convert (input, output_file[, input_options]) jobs concurrently"""
+        semaphore = asyncio.Semaphore(max(1, self.cores_to_use // self.ffmpeg_threads))
+        with tqdm(total=round(self.total_duration), desc="Converting chunks", unit="s",
+                  bar_format="{l_bar}{bar}| {n:.0f}/{total:.0f}s [{elapsed}<{remaining}]") as pbar:
+            tasks = [self._convert_chunk_async(semaphore, pbar, *job) for job in jobs]
+            for task in asyncio.as_completed(tasks):
+                if not await task:
+                    raise Exception("Failed to convert chunk")
+
+    def _convert_whole(self, input_file, output_file):
+        """Convert the whole input with a single ffmpeg run"""
+        try:
+            command = self._build_encode_command(input_file, output_file)
+            return run_command(command) == 0 and os.path.exists(output_file)
         except:
             return False
 
+    def _can_remux(self, video_info):
+        """Check whether the source can be copied into MP4 without re-encoding"""
+        if self.force_reencode or self.compression_level or self.target_size:
+            return False
+        if self.quality != DEFAULT_QUALITY:
+            return False
+
+        streams = video_info.get('streams', [])
+        video_codecs = [s.get('codec_name') for s in streams if s.get('codec_type') == 'video']
+        audio_codecs = [s.get('codec_name') for s in streams if s.get('codec_type') == 'audio']
+        return (bool(video_codecs)
+                and all(codec in REMUX_VIDEO_CODECS for codec in video_codecs)
+                and all(codec in REMUX_AUDIO_CODECS for codec in audio_codecs))
+
+    def _remux(self, input_file, output_file, video_info):
+        """Copy the source streams into an MP4 container"""
+        try:
+            command = [
+                'ffmpeg',
+                '-i', input_file,
+                '-map', '0:v',
+                '-map', '0:a?',
+                '-c', 'copy'
+            ]
+
+            # ADTS AAC from the TS has to be converted for the MP4 muxer
+            audio_codecs = [s.get('codec_name') for s in video_info['streams'] if s.get('codec_type') == 'audio']
+            if audio_codecs and all(codec == 'aac' for codec in audio_codecs):
+                command.extend(['-bsf:a', 'aac_adtstoasc'])
+
+            command.extend(['-movflags', '+faststart', '-y', output_file])
+
+            return run_command(command) == 0 and os.path.exists(output_file)
+        except:
+            return False
+
+    def _should_chunk(self, duration):
+        """Decide whether splitting into parallel chunks is worth the overhead"""
+        # Hardware encoders run near real time, and short files are dominated
+        # by process startup and the merge pass
+        if self.hwaccel in HWACCEL_ENCODERS:
+            return False
+        # Chunks run cores_to_use // ffmpeg_threads at a time; with fewer than
+        # two in flight the probe, extra startups and merge are pure overhead
+        if self.cores_to_use // self.ffmpeg_threads < 2:
+            return False
+        # Other files already keep the remaining cores busy
+        if self.jobs > 1:
+            return False
+        # A single encoder sees across chunk boundaries and starts only once
+        if self.pipeline == 'streamed':
+            return False
+        return duration >= MIN_CHUNKED_DURATION
+
     def merge_chunks(self, chunk_files, final_output):
         """Merge converted chunks into final video"""
         try:
-            list_file = tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt')
-            for chunk in chunk_files:
-                list_file.write(f"file '{chunk}'\n")
-            list_file.close()
-
+            # Feed the concat list on stdin instead of a temp file
             command = [
                 'ffmpeg',
                 '-f', 'concat',
                 '-safe', '0',
-                '-i', list_file.name,
+                '-protocol_whitelist', 'pipe,file',
+                '-i', 'pipe:0',
                 '-c', 'copy',
                 '-movflags', '+faststart',
                 '-y',
                 final_output
             ]
 
-            if os.name != 'nt':
-                command = ['nice', '-n', '19'] + command
-
-            subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            os.unlink(list_file.name)
-            return os.path.exists(final_output)
+            process = subprocess.Popen(
+                command,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            )
+            process.communicate(input=build_concat_list(chunk_files))
+            return process.returncode == 0 and os.path.exists(final_output)
         except:
             return False
 
+    def _keyframe_times(self, input_file):
+        """Keyframe timestamps of the first video stream, relative to the start of the file"""
+        try:
+            # Packet flags come from the demuxer, so nothing is decoded
+            cmd = [
+                'ffprobe',
+                '-v', 'quiet',
+                '-select_streams', 'v:0',
+                '-show_entries', 'packet=pts_time,flags',
+                '-of', 'csv=print_section=0',
+                input_file
+            ]
+            output = subprocess.check_output(cmd).decode('utf-8')
+
+            # -ss is relative to the container start time, not to raw timestamps
+            video_info = get_video_info(input_file, self._probe_cache)
+            start_time = float(video_info['format'].get('start_time', 0))
+            duration = float(video_info['format']['duration'])
+
+            times = []
+            for line in output.splitlines():
+                pts_time, _, flags = line.partition(',')
+                if 'K' in flags and pts_time not in ('', 'N/A'):
+                    # ffmpeg works in microseconds; round so chunk bounds meet exactly
+                    keyframe_time = round(float(pts_time) - start_time, 6)
+                    # A timestamp jump or wrap means keyframe times no longer match
+                    # -ss seek positions; let the caller copy chunks out instead
+                    if not 0 <= keyframe_time <= duration or (times and keyframe_time <= times[-1]):
+                        return []
+                    times.append(keyframe_time)
+            return times
+        except Exception:
+            return []
+
+    def _keyframe_chunks(self, keyframes, duration, chunk_size):
+        """Start and length of chunks that begin on keyframes, about chunk_size apart"""
+        cuts = [0.0]
+        for keyframe in keyframes:
+            if keyframe >= cuts[-1] + chunk_size:
+                cuts.append(keyframe)
+        return [(start, round(end - start, 6)) for start, end in zip(cuts, cuts[1:] + [duration])]
+
+    def _convert_chunked(self, input_file, output_file, duration, chunk_size):
+        """Convert chunks of the input in parallel and merge"""
+        # One work dir per file, holding both the chunks and their converted copies
+        temp_dir = make_temp_dir(input_file)
+
+        try:
+            keyframes = self._keyframe_times(input_file)
+            if keyframes:
+                # Every encoder seeks straight into the source, no chunk files needed
+                bounds = self._keyframe_chunks(keyframes, duration, chunk_size)
+                print(f"Encoding {len(bounds)} keyframe-aligned chunks...")
+                jobs = []
+                for i, (start, length) in enumerate(bounds):
+                    # The last chunk runs to the end in case the duration is short
+                    if i < len(bounds) - 1:
+                        input_options = ('-ss', str(start), '-t', str(length))
+                    else:
+                        input_options = ('-ss', str(start))
+                    jobs.append((
+                        input_file,
+                        os.path.join(temp_dir, f"converted_{i:03d}.mp4"),
+                        input_options
+                    ))
+            else:
+                # No keyframe index, copy the chunks out first
+                chunks, _ = self.create_optimized_chunks(
+                    input_file, 
+                    temp_dir, 
+                    chunk_size
+                )
+                
+                if not chunks:
+                    raise Exception("Failed to create chunks")
+
+                jobs = [
+                    (chunk, os.path.join(temp_dir, f"converted_{i:03d}.mp4"))
+                    for i, chunk in enumerate(chunks)
+                ]
+
+            # Convert chunks
+            asyncio.run(self._encode_all(jobs))
+            converted_chunks = [job[1] for job in jobs]
+
+            # Merge chunks
+            print("\nMerging chunks...")
+            if not self.merge_chunks(converted_chunks, output_file):
+                raise Exception("Failed to merge chunks")
+
+        finally:
+            # Clean up temporary directory
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
     def convert_video(self, input_file, output_dir, chunk_size=None):
         """Convert video with all optimizations"""
         try:
@@ -217,80 +596,54 @@ class VideoProcessor:
             print(f"Analyzing video...")
             
             # Get initial duration from video info
-            video_info = get_video_info(input_file)
+            video_info = get_video_info(input_file, self._probe_cache)
             if not video_info or 'format' not in video_info:
                 raise Exception("Could not analyze video file")
                 
             duration = float(video_info['format']['duration'])
-            
-            # Calculate chunk size if not provided
-            if not chunk_size:
-                chunk_size = min(MAX_CHUNK_SIZE, max(MIN_CHUNK_SIZE, duration / 10))
-                
             print(f"Video duration: {duration:.1f} seconds")
-            print(f"Using chunk size: {chunk_size} seconds")
             
-            # Create temporary directories
-            temp_dir = tempfile.mkdtemp()
-            temp_output_dir = tempfile.mkdtemp()
+            self.total_duration = duration  # Store for target size calculations
 
-            try:
-                # Create optimized chunks
-                chunks, _ = self.create_optimized_chunks(
-                    input_file, 
-                    temp_dir, 
-                    chunk_size
-                )
-                
-                if not chunks:
-                    raise Exception("Failed to create chunks")
+            if self._can_remux(video_info):
+                print("Source is already H.264, remuxing without re-encoding...")
+                if not self._remux(input_file, output_file, video_info):
+                    raise Exception("Failed to remux video")
+            elif self._should_chunk(duration):
+                self.optimize_video_params(video_info)
+                # Calculate chunk size if not provided
+                if not chunk_size:
+                    chunk_size = min(MAX_CHUNK_SIZE, max(MIN_CHUNK_SIZE, duration / 10))
+                print(f"Using chunk size: {chunk_size} seconds")
+                self._convert_chunked(input_file, output_file, duration, chunk_size)
+            else:
+                self.optimize_video_params(video_info)
+                print("Converting in a single pass...")
+                if not self._convert_whole(input_file, output_file):
+                    if self.hwaccel == 'none':
+                        raise Exception("Failed to convert video")
+                    print(f"{self.hwaccel} encode failed, retrying with libx264...")
+                    self._use_software_encoder(video_info)
+                    if not self._convert_whole(input_file, output_file):
+                        raise Exception("Failed to convert video")
 
-                self.total_duration = duration  # Store for target size calculations
-
-                # Convert chunks
-                converted_chunks = []
-                with tqdm(total=len(chunks), desc="Converting chunks", unit="chunk") as pbar:
-                    with ThreadPoolExecutor(max_workers=self.cores_to_use) as executor:
-                        futures = []
-                        for i, chunk in enumerate(chunks):
-                            chunk_output = os.path.join(temp_output_dir, f"converted_{i:03d}.mp4")
-                            future = executor.submit(self.convert_chunk, chunk, chunk_output)
-                            futures.append((future, chunk_output))
-
-                        for future, chunk_output in futures:
-                            if future.result():
-                                converted_chunks.append(chunk_output)
-                                pbar.update(1)
-                            else:
-                                raise Exception("Failed to convert chunk")
-
-                # Merge chunks
-                print("\nMerging chunks...")
-                if not self.merge_chunks(converted_chunks, output_file):
-                    raise Exception("Failed to merge chunks")
-
-                # Calculate results
-                input_size = os.path.getsize(input_file) / (1024 * 1024)  # MB
-                output_size = os.path.getsize(output_file) / (1024 * 1024)  # MB
-                compression_ratio = input_size / output_size
-                
-                return {
-                    'success': True,
-                    'input_file': input_filename,
-                    'output_file': output_file,
-                    'size': output_size,
-                    'duration': f"{duration:.1f} seconds",
-                    'compression_ratio': compression_ratio
-                }
-
-            finally:
-                # Clean up temporary directories
-                shutil.rmtree(temp_dir, ignore_errors=True)
-                shutil.rmtree(temp_output_dir, ignore_errors=True)
+            # Calculate results
+            input_size = os.path.getsize(input_file) / (1024 * 1024)  # MB
+            output_size = os.path.getsize(output_file) / (1024 * 1024)  # MB
+            compression_ratio = input_size / output_size
+            
+            return {
+                'success': True,
+                'input_file': input_filename,
+                'output_file': output_file,
+                'size': output_size,
+                'duration': f"{duration:.1f} seconds",
+                'compression_ratio': compression_ratio
+            }
 
         except Exception as e:
             return {
                 'success': False,
                 'input_file': input_filename,
                 'error': str(e)
-            }
\ No newline at end of file
+            }
@@ -1,6 +1,14 @@
 import argparse
 import os
 from pathlib import Path
+from .constants import HWACCEL_CHOICES, PIPELINE_CHOICES, DEFAULT_QUALITY
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description='Optimized TS to MP4 Converter with Compression Options')
@@ -11,9 +19,12 @@ def parse_arguments():
     parser.add_argument('-c', '--chunk-size', type=int,
                        help='Chunk size in seconds (auto-optimized if not specified)')
     parser.add_argument('--cpu-limit', type=float, default=0.1,
-                       help='CPU usage limit (0.1 = 10%)')
+                       help='Share of physical cores each file may use (0.1 = 10%%); '
+                            'with several jobs the total is jobs times this')
     parser.add_argument('--delete-original', action='store_true',
                        help='Delete original files after successful conversion')
+    parser.add_argument('-j', '--jobs', type=positive_int,
+                       help='Number of files to convert in parallel (default: CPU count / cores per file)')
     parser.add_argument('--keep-failed', action='store_true',
                        help='Keep original files even if conversion fails')
 
@@ -26,8 +37,15 @@ def parse_arguments():
     compress_group.add_argument('--target-size', type=float,
                               help='Target size in MB (will try to compress to this size)')
     
-    parser.add_argument('--quality', type=int, choices=range(16, 29), default=23,
+    parser.add_argument('--quality', type=int, choices=range(16, 29), default=DEFAULT_QUALITY,
                        help='Video quality (16-28, lower is better quality, default: 23)')
+    parser.add_argument('--hwaccel', choices=HWACCEL_CHOICES, default='auto',
+                       help='Hardware encoder to use (auto tries NVENC, VAAPI, then QSV; none forces libx264)')
+    parser.add_argument('--pipeline', choices=PIPELINE_CHOICES, default='parallel',
+                       help='Long CPU encodes: one ffmpeg per chunk (parallel) or a single '
+                            'encoder over the whole file (streamed)')
+    parser.add_argument('--force-reencode', action='store_true',
+                       help='Re-encode even when the source is already H.264/AAC and could just be remuxed')
     
     return parser.parse_args()
 
@@ -38,10 +56,22 @@ def get_file_list(input_path, recursive=False):
         return list(Path(input_path).glob(pattern))
     return [Path(input_path)]
 
-def print_settings(args, processor_cores):
+def get_output_dir(file, input_path, output_dir):
+    """Output directory for file, mirroring its subdirectory under input_path"""
+    if os.path.isdir(input_path):
+        relative = os.path.relpath(os.path.dirname(os.path.abspath(file)), os.path.abspath(input_path))
+        if relative != os.curdir:
+            return os.path.join(output_dir, relative)
+    return output_dir
+
+def print_settings(args, processor_cores, hwaccel):
     """Print current conversion settings"""
     print(f"\nConverter Settings:")
-    print(f"CPU usage limit: {args.cpu_limit*100}% ({processor_cores} cores)")
+    print(f"CPU limit per file: {args.cpu_limit*100}% ({processor_cores} cores)")
+    print(f"Total cores used: {args.jobs * processor_cores}")
+    print(f"Hardware acceleration: {hwaccel}")
+    print(f"Parallel jobs: {args.jobs}")
+    print(f"Chunk pipeline: {args.pipeline}")
     print(f"Compression: {'Disabled (maintaining original quality)' if args.no_compress else args.compress or f'Target size {args.target_size}MB'}")
     if not args.no_compress:
         print(f"Quality level: {args.quality} (16=best, 28=worst)")
@@ -1,25 +1,175 @@
 import os
+import shutil
 import subprocess
+import multiprocessing
 import json
+import tempfile
+import psutil
 from datetime import datetime
 
-def get_video_info(input_file):
-    """Get video duration and details using ffprobe"""
+SHM_DIR = '/dev/shm'
+CPU_TOPOLOGY_DIR = '/sys/devices/system/cpu/cpu{}/topology'
+
+# Resolved once so hot paths don't search PATH on every launch
+FFMPEG_PATH = shutil.which('ffmpeg') or 'ffmpeg'
+
+def run_command(command):
+    """Run a command with stdout/stderr discarded and return its exit code
+
+    Uses posix_spawn where available, which avoids the fork and fd cleanup
+    done by subprocess for every ffmpeg launch.
+    """
+    if not hasattr(os, 'posix_spawn'):
+        return subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode
+
+    executable = FFMPEG_PATH if command[0] == 'ffmpeg' else shutil.which(command[0])
+    if not executable:
+        raise FileNotFoundError(f"Command not found: {command[0]}")
+
+    file_actions = [
+        (os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0),
+        (os.POSIX_SPAWN_OPEN, 2, os.devnull, os.O_WRONLY, 0)
+    ]
+    pid = os.posix_spawn(executable, command, os.environ, file_actions=file_actions)
+    _, status = os.waitpid(pid, 0)
+    return os.waitstatus_to_exitcode(status)
+
+def get_core_cpus():
+    """One allowed logical CPU per physical core, falling back to every allowed CPU"""
     try:
-        cmd = [
-            'ffprobe',
-            '-v', 'quiet',
-            '-print_format', 'json',
-            '-show_format',
-            '-show_streams',
-            input_file
-        ]
-        result = subprocess.check_output(cmd).decode('utf-8')
-        return json.loads(result)
+        allowed = sorted(psutil.Process().cpu_affinity())
+    except Exception:
+        return list(range(multiprocessing.cpu_count()))
+
+    # SMT siblings report the same package and core id
+    cpus, seen = [], set()
+    for cpu in allowed:
+        topology = CPU_TOPOLOGY_DIR.format(cpu)
+        try:
+            with open(os.path.join(topology, 'physical_package_id')) as f:
+                package_id = f.read().strip()
+            with open(os.path.join(topology, 'core_id')) as f:
+                core_id = f.read().strip()
+        except OSError:
+            return allowed
+        if (package_id, core_id) not in seen:
+            seen.add((package_id, core_id))
+            cpus.append(cpu)
+    return cpus
+
+# Stop after the container header instead of decoding frames to fill in stream info
+FAST_PROBE_ARGS = ['-probesize', '32768', '-analyzeduration', '0', '-fflags', '+nobuffer']
+
+def _run_ffprobe(input_file, extra_args=()):
+    """Run ffprobe and return its parsed JSON output"""
+    cmd = [
+        'ffprobe',
+        '-v', 'quiet',
+        *extra_args,
+        '-print_format', 'json',
+        '-show_format',
+        '-show_streams',
+        input_file
+    ]
+    result = subprocess.check_output(cmd).decode('utf-8')
+    return json.loads(result)
+
+def _is_complete_probe(info):
+    """Check that a probe found the codecs, frame size and duration"""
+    streams = info.get('streams') or []
+    return (bool(streams)
+            and all(s.get('codec_name') for s in streams)
+            and all(s.get('width') for s in streams if s.get('codec_type') == 'video')
+            and 'duration' in info.get('format', {}))
+
+def get_video_info(input_file, cache=None):
+    """Get video duration and details using ffprobe
+
+    When a cache dict is given, results are stored in it keyed on the
+    absolute path and mtime so the same file is only probed once.
+    """
+    try:
+        if cache is not None:
+            key = (os.path.abspath(input_file), os.path.getmtime(input_file))
+            if key in cache:
+                return cache[key]
+
+        # Header-only probe first, deep probe if it left anything out
+        try:
+            info = _run_ffprobe(input_file, FAST_PROBE_ARGS)
+        except subprocess.CalledProcessError:
+            info = {}
+        if not _is_complete_probe(info):
+            info = _run_ffprobe(input_file)
+        if cache is not None:
+            cache[key] = info
+        return info
     except Exception as e:
         print(f"Error getting video info: {str(e)}")
         return None
 
+def _list_ffmpeg_codecs(flag):
+    """Get the set of codec names listed by `ffmpeg -encoders` / `ffmpeg -decoders`"""
+    try:
+        output = subprocess.check_output(
+            ['ffmpeg', '-hide_banner', flag],
+            stderr=subprocess.DEVNULL
+        ).decode('utf-8')
+        codecs = set()
+        for line in output.splitlines():
+            parts = line.split()
+            # Codec lines look like " V....D h264_nvenc  NVIDIA NVENC H.264 encoder"
+            if len(parts) >= 2 and len(parts[0]) == 6:
+                codecs.add(parts[1])
+        return codecs
+    except Exception:
+        return set()
+
+def get_ffmpeg_encoders():
+    """Get the set of encoder names supported by the installed ffmpeg"""
+    return _list_ffmpeg_codecs('-encoders')
+
+def get_ffmpeg_decoders():
+    """Get the set of decoder names supported by the installed ffmpeg"""
+    return _list_ffmpeg_codecs('-decoders')
+
+def can_encode_with(codec, input_params=(), output_params=()):
+    """Check that ffmpeg can encode a short test clip with codec on this machine"""
+    cmd = [
+        'ffmpeg', '-hide_banner', '-loglevel', 'error',
+        *input_params,
+        '-f', 'lavfi', '-i', 'color=s=256x256:d=0.1',
+        *output_params,
+        '-c:v', codec,
+        '-f', 'null', '-'
+    ]
+    try:
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=30)
+        return result.returncode == 0
+    except Exception:
+        return False
+
+def make_temp_dir(input_file):
+    """Create a temp dir for intermediates of input_file, in RAM when there is room"""
+    try:
+        # Keep headroom for the chunks and their converted copies. Only a lone
+        # job is chunked, so no other file competes for the space
+        if (os.path.isdir(SHM_DIR)
+                and shutil.disk_usage(SHM_DIR).free > 2 * os.path.getsize(input_file)):
+            return tempfile.mkdtemp(dir=SHM_DIR)
+    except OSError:
+        pass
+    return tempfile.mkdtemp()
+
+def build_concat_list(files):
+    """Build a concat demuxer list for files, ready to write to ffmpeg's stdin"""
+    lines = []
+    for path in files:
+        # Quotes inside a quoted entry are written as '\''
+        escaped = path.replace("'", "'\\''")
+        lines.append(f"file '{escaped}'\n")
+    return ''.join(lines).encode('utf-8')
+
 def generate_output_filename(input_file, output_dir):
     """Generate output filename with timestamp"""
     input_filename = os.path.basename(input_file)